@@ -64,15 +64,18 @@ __version__ = "0.1.13a5"
 
 # flake8: noqa
 from .explore import Explorer, Launcher
-try:
-    import hydra
-except ImportError:
-    pass
-else:
-    from .hydra import hydra_main
 from . import conf, grid
 from .git_save import to_absolute_path
 from .link import Link
 from .main import argparse_main
 from .shep import Sheep
 from .xp import get_xp, is_xp, XP
+
+
+def __getattr__(name):
+    # Hydra is slow to import, and not needed by argparse based projects,
+    # so `hydra_main` is only imported when actually used.
+    if name == "hydra_main":
+        from .hydra import hydra_main
+        return hydra_main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,17 +7,30 @@
 """
 Basic configuration for Dora is here.
 """
-from argparse import Namespace
 from dataclasses import dataclass, field
-from fnmatch import fnmatch
+from fnmatch import translate
+from functools import lru_cache
 from pathlib import Path
+import re
 import typing as tp
 
 from omegaconf.dictconfig import DictConfig
 from omegaconf import OmegaConf
 
+if tp.TYPE_CHECKING:
+    # Only used for annotations, argparse takes a few ms to import.
+    from argparse import Namespace
 
-def update_from_args(data: tp.Any, args: Namespace):
+
+@lru_cache(maxsize=128)
+def _compile_patterns(patterns: tp.Tuple[str, ...]) -> tp.Optional[tp.Pattern]:
+    # Compile a list of glob patterns into a single regex.
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{translate(pattern)})" for pattern in patterns))
+
+
+def update_from_args(data: tp.Any, args: 'Namespace'):
     """Update the given dataclass from the argument parser args.
     """
     for key in data.__dict__:
@@ -172,10 +185,8 @@ class DoraConfig:
     def is_excluded(self, arg_name: str) -> bool:
         """Return True if the given argument name should be excluded from
         the signature."""
-        for pattern in self.exclude:
-            if fnmatch(arg_name, pattern):
-                return True
-        return False
+        regex = _compile_patterns(tuple(self.exclude))
+        return regex is not None and regex.match(arg_name) is not None
 
     def __setattr__(self, name, value):
         if name in ['dir', 'shared']:
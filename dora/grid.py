@@ -32,6 +32,7 @@ from .utils import import_or_fatal, reliable_rmtree, try_load
 import treetable as tt
 
 log: tp.Callable[[str], None] = partial(simple_log, "Grid:")
+_MAX_GRID_WORKERS = 8
 
 
 def no_print(*args, **kwargs):
@@ -169,7 +170,10 @@ def run_grid(main: DecoratedMain, explorer: Explorer, grid_name: str,
     herd = Herd()
     shepherd = Shepherd(main, log=log)
     if main._slow:
-        with ProcessPoolExecutor(4) as pool:
+        # Each worker must import the training code first, so there is little
+        # to gain from going beyond a few workers.
+        workers = min(_MAX_GRID_WORKERS, os.cpu_count() or 1)
+        with ProcessPoolExecutor(workers) as pool:
             launcher = Launcher(shepherd, slurm, herd, pool=pool)
             explorer(launcher)
             herd.complete()
@@ -302,7 +306,9 @@ def run_grid(main: DecoratedMain, explorer: Explorer, grid_name: str,
             if not sheep.log.exists():
                 fatal(f"Log file does not exist for sheep {name}.")
             try:
-                shutil.copyfileobj(open(sheep.log), sys.stdout)
+                sys.stdout.flush()
+                with open(sheep.log, "rb") as f:
+                    shutil.copyfileobj(f, sys.stdout.buffer, 1 << 18)
             except BrokenPipeError:
                 pass
         return sheeps
@@ -8,15 +8,14 @@
 This module provides support for Hydra, in particular the `main` wrapper between
 the end user `main` function and Hydra.
 """
-import copy
-from collections import namedtuple, OrderedDict
+from collections import namedtuple
+from functools import lru_cache
 from importlib.util import find_spec
 import json
 import logging
 from pathlib import Path
 import sys
 import typing as tp
-from unittest import mock
 
 import hydra
 from hydra.core.global_hydra import GlobalHydra
@@ -29,6 +28,7 @@ else:
     old_hydra = False
 
 from omegaconf.dictconfig import DictConfig
+from omegaconf import OmegaConf
 
 from .conf import DoraConfig, SlurmConfig, update_from_hydra
 from .main import DecoratedMain, MainFun
@@ -37,13 +37,17 @@ from .xp import XP, get_xp, is_xp
 logger = logging.getLogger(__name__)
 
 
-def _no_copy(self: tp.Any, memo: tp.Any):
-    # Dirty trick to speed up Hydra, will remove when Hydra 1.1
-    # is released, which solves the issues.
-    return self
+if old_hydra:
+    import copy
+    from unittest import mock
 
+    def _no_copy(self: tp.Any, memo: tp.Any):
+        # Dirty trick to speed up Hydra, will remove when Hydra 1.1
+        # is released, which solves the issues.
+        return self
 
-_Difference = namedtuple("_Difference", "path key ref other ref_value other_value")
+
+_Difference = namedtuple("_Difference", "name key ref other ref_value other_value")
 
 
 class _NotThere:
@@ -53,17 +57,15 @@ class _NotThere:
 NotThere = _NotThere()
 
 
-def _compare_config(ref, other, path=[]):
+def _compare_config(ref, other, prefix=""):
     """
     Given two configs, gives an iterator over all the differences. For each difference,
-    this will give a _Difference namedtuple.
+    this will give a _Difference namedtuple, with the full dotted name of the key.
     """
-    keys = sorted(ref.keys())
-    remaining = sorted(set(other.keys()) - set(ref.keys()))
-    delta = []
-    path.append(None)
+    keys = ref.keys()
+    remaining = other.keys() - keys
     for key in keys:
-        path[-1] = key
+        name = f"{prefix}.{key}" if prefix else key
         ref_value = ref[key]
         assert key in other, f"XP config shouldn't be missing any key. Missing key {key}"
         other_value = other[key]
@@ -72,31 +74,33 @@ def _compare_config(ref, other, path=[]):
             assert isinstance(other_value, DictConfig), \
                 "Structure of config should be identical between XPs. "\
                 f"Wrong type for {key}, expected DictConfig, got {type(other_value)}."
-            yield from _compare_config(ref_value, other_value, path)
+            yield from _compare_config(ref_value, other_value, name)
         elif other_value != ref_value:
-            yield _Difference(list(path), key, ref, other, ref_value, other_value)
+            yield _Difference(name, key, ref, other, ref_value, other_value)
 
     for key in remaining:
-        path[-1] = key
+        name = f"{prefix}.{key}" if prefix else key
         other_value = other[key]
-        yield _Difference(list(path), key, ref, other, NotThere, other_value)
-    path.pop(-1)
-    return delta
+        yield _Difference(name, key, ref, other, NotThere, other_value)
+
+
+def _diff_order(diff: _Difference):
+    # Sort key to order differences as a depth first traversal of the configs
+    # with sorted keys, keys missing from the reference coming last at each level.
+    parents = diff.name.split(".")[:-1]
+    return [(False, key) for key in parents] + [(diff.ref_value is NotThere, diff.key)]
 
 
 def _simplify_argv(argv: tp.Sequence[str]) -> tp.List[str]:
-    simplified = []
-    seen = set()
-    for arg in list(argv)[::-1]:
-        assert '=' in arg, f'Argument {arg} does not contain ='
-        key, value = arg.split('=', 1)
+    # Only keep the last override for each key, at the position of that last override.
+    simplified: tp.Dict[str, str] = {}
+    for arg in argv:
+        key, sep, _ = arg.partition('=')
+        assert sep, f'Argument {arg} does not contain ='
         key = key.strip()
-        if key in seen:
-            continue
-        else:
-            seen.add(key)
-            simplified.append(arg)
-    return simplified[::-1]
+        simplified.pop(key, None)
+        simplified[key] = arg
+    return list(simplified.values())
 
 
 def _dump_key(key):
@@ -111,24 +115,70 @@ def _dump_key(key):
         raise TypeError(f"Unsupported dict key type {type(key)} for key {key}")
 
 
-def _hydra_value_as_override(value):
+def _dump_value(value, out: tp.List[str]):
     # hydra doesn't support parsing dict with the json format, so for now
     # we have to use a custom function to dump a value.
+    # All the tokens are appended to `out`, to be joined only once.
     if value is None:
-        return "null"
+        out.append("null")
     elif isinstance(value, (bool, int, float, str)):
-        return json.dumps(value)
+        out.append(json.dumps(value))
     elif isinstance(value, dict):
-        return "{" + ", ".join(
-            f"{_dump_key(key)}: {_hydra_value_as_override(val)}"
-            for key, val in value.items()
-        ) + "}"
+        out.append("{")
+        for index, (key, val) in enumerate(value.items()):
+            if index:
+                out.append(", ")
+            out.append(_dump_key(key))
+            out.append(": ")
+            _dump_value(val, out)
+        out.append("}")
     elif isinstance(value, (list, tuple)):
-        return "[" + ", ".join(_hydra_value_as_override(val) for val in value) + "]"
+        out.append("[")
+        for index, val in enumerate(value):
+            if index:
+                out.append(", ")
+            _dump_value(val, out)
+        out.append("]")
     else:
         raise TypeError(f"Unsupported value type {type(value)} for value {value}")
 
 
+def _value_as_override(value):
+    out: tp.List[str] = []
+    _dump_value(value, out)
+    return "".join(out)
+
+
+_OVERRIDE_CACHE_SIZE = 4096
+_override_cache: tp.Dict[tp.Tuple[type, str], str] = {}
+
+
+def _hydra_value_as_override(value):
+    # The same values tend to come back over and over in a grid search.
+    # Values are not always hashable, so we cache on their repr,
+    # which also differentiates `True` from `1` or `1.0`, unlike `==`.
+    key = (type(value), repr(value))
+    try:
+        return _override_cache[key]
+    except KeyError:
+        pass
+    override = _value_as_override(value)
+    if len(_override_cache) < _OVERRIDE_CACHE_SIZE:
+        _override_cache[key] = override
+    return override
+
+
+@lru_cache(maxsize=None)
+def _list_config_groups(config_path: Path, job_name: str,
+                        hydra_kwargs: tp.Tuple[tp.Tuple[str, tp.Any], ...]) -> tp.Tuple[str, ...]:
+    # Config groups only depend on the config folder, so we only need
+    # to ask Hydra once, even when creating multiple `HydraMain`.
+    with initialize_config_dir(str(config_path), job_name=job_name, **dict(hydra_kwargs)):
+        gh = GlobalHydra.instance().hydra
+        assert gh is not None
+        return tuple(gh.list_all_config_groups())
+
+
 class HydraMain(DecoratedMain):
     _slow = True
 
@@ -196,25 +246,28 @@ class HydraMain(DecoratedMain):
         # arg is either a str (in which case it is a raw override)
         # or a dict, in which case each entry is an override,
         # or a list of dict or a list of str.
-        argv = []
-        if isinstance(arg, str):
-            argv.append(arg)
-        elif isinstance(arg, dict):
-            for key, value in arg.items():
-                if key not in self._config_groups:
-                    # We need to convert the value using a custom function
-                    # to respect how Hydra parses overrides.
-                    value = _hydra_value_as_override(value)
-                argv.append(f"{key}={value}")
-        elif isinstance(arg, (list, tuple)):
-            for part in arg:
-                argv += self.value_to_argv(part)
-        else:
-            raise ValueError(f"Can only process dict, tuple, lists and str, but got {arg}")
+        argv: tp.List[str] = []
+        # Nested lists are processed with a stack rather than recursively.
+        stack = [arg]
+        while stack:
+            arg = stack.pop()
+            if isinstance(arg, str):
+                argv.append(arg)
+            elif isinstance(arg, dict):
+                for key, value in arg.items():
+                    if key not in self._config_groups:
+                        # We need to convert the value using a custom function
+                        # to respect how Hydra parses overrides.
+                        value = _hydra_value_as_override(value)
+                    argv.append(f"{key}={value}")
+            elif isinstance(arg, (list, tuple)):
+                stack.extend(reversed(arg))
+            else:
+                raise ValueError(f"Can only process dict, tuple, lists and str, but got {arg}")
         return argv
 
-    def get_name_parts(self, xp: XP) -> OrderedDict:
-        parts = OrderedDict()
+    def get_name_parts(self, xp: XP) -> tp.Dict[str, tp.Any]:
+        parts = {}
         assert xp.delta is not None
         for name, value in xp.delta:
             parts[name] = value
@@ -233,12 +286,9 @@ class HydraMain(DecoratedMain):
             if is_xp():
                 sys.argv.remove(run_dir)
 
-    def _get_config_groups(self) -> tp.List[str]:
-        with initialize_config_dir(str(self.full_config_path), job_name=self._job_name,
-                                   **self.hydra_kwargs):
-            gh = GlobalHydra.instance().hydra
-            assert gh is not None
-            return list(gh.list_all_config_groups())
+    def _get_config_groups(self) -> tp.FrozenSet[str]:
+        return frozenset(_list_config_groups(
+            self.full_config_path, self._job_name, tuple(sorted(self.hydra_kwargs.items()))))
 
     def _is_active(self, argv: tp.List[str]) -> bool:
         if '-m' in argv or '--multirun' in argv:
@@ -252,23 +302,22 @@ class HydraMain(DecoratedMain):
         Return base config based on composition, along with delta for the
         composition overrides.
         """
+        to_keep = []
+        groups: tp.Dict[str, str] = {}
+        for arg in overrides:
+            group, _, value = arg.partition('=')
+            if group in self._config_groups:
+                to_keep.append(arg)
+                # Last override wins, and goes last.
+                groups.pop(group, None)
+                groups[group] = value
+        if not to_keep:
+            # No need to go through Hydra when no config group is overriden.
+            return self._base_cfg, []
         with initialize_config_dir(str(self.full_config_path), job_name=self._job_name,
                                    **self.hydra_kwargs):
-            gh = GlobalHydra.instance().hydra
-            assert gh is not None
-            to_keep = []
-            delta: tp.List[tp.Tuple[str, str]] = []
-            for arg in overrides:
-                for group in self._config_groups:
-                    if arg.startswith(f'{group}='):
-                        to_keep.append(arg)
-                        _, value = arg.split('=', 1)
-                        delta = [(g, v) for g, v in delta if g != group]
-                        delta.append((group, value))
-            if not to_keep:
-                return self._base_cfg, []
-            cfg = self._get_config_noinit(to_keep)
-            return cfg, delta
+            cfg = self._compose_readonly(to_keep)
+        return cfg, list(groups.items())
 
     def _get_config(self,
                     overrides: tp.List[str] = []) -> DictConfig:
@@ -280,23 +329,42 @@ class HydraMain(DecoratedMain):
                                    **self.hydra_kwargs):
             return self._get_config_noinit(overrides)
 
-    def _get_config_noinit(self, overrides: tp.List[str] = []) -> DictConfig:
-        if old_hydra:
+    if old_hydra:
+        def _get_config_noinit(self, overrides: tp.List[str] = []) -> DictConfig:
             with mock.patch.object(DictConfig, "__deepcopy__", _no_copy):
                 cfg = compose(self.config_name, overrides)  # type: ignore
-            cfg = copy.deepcopy(cfg)
-        else:
+            return copy.deepcopy(cfg)
+
+        def _compose_readonly(self, overrides: tp.List[str] = []) -> DictConfig:
+            # Nodes might be shared with Hydra internals, we cannot flag
+            # them as read only without impacting later compositions.
+            with mock.patch.object(DictConfig, "__deepcopy__", _no_copy):
+                return compose(self.config_name, overrides)  # type: ignore
+    else:
+        def _get_config_noinit(self, overrides: tp.List[str] = []) -> DictConfig:
+            return compose(self.config_name, overrides)  # type: ignore
+
+        def _compose_readonly(self, overrides: tp.List[str] = []) -> DictConfig:
+            """
+            Compose a config that is only going to be read, e.g. to compute the delta
+            with another config. This skips any copy, so the returned config should
+            never be modified nor handed over to the user code.
+            """
+            # Recent Hydra already merges without deepcopies (`no_deepcopy_set_nodes`).
+            # Its only call to `OmegaConf.merge` is against ConfigStore schemas,
+            # so we cannot swap it for `OmegaConf.unsafe_merge` without corrupting them.
             cfg = compose(self.config_name, overrides)  # type: ignore
-        return cfg
+            OmegaConf.set_readonly(cfg, True)
+            return cfg
 
     def _get_delta(self, init: DictConfig, other: DictConfig):
         """
         Returns an iterator over all the differences between the init and other config.
         """
+        diffs = sorted(_compare_config(init, other), key=_diff_order)
         delta = []
-        for diff in _compare_config(init, other):
-            name = ".".join(diff.path)
-            delta.append((name, diff.other_value))
+        for diff in diffs:
+            delta.append((diff.name, diff.other_value))
         return delta
 
 
@@ -54,7 +54,9 @@ def info_action(args, main: DecoratedMain):
             fatal("No log, sheep hasn't been scheduled yet.")
         if not sheep.log.exists():
             fatal(f"Log {sheep.log} does not exist")
-        shutil.copyfileobj(open(sheep.log, "r"), sys.stdout, 4096)
+        sys.stdout.flush()
+        with open(sheep.log, "rb") as f:
+            shutil.copyfileobj(f, sys.stdout.buffer, 1 << 18)
     if args.tail:
         if not sheep.log.exists():
             fatal(f"Log {sheep.log} does not exist")
@@ -8,8 +8,12 @@
 Launch command.
 """
 from functools import partial
-import subprocess as sp
+import os
+from pathlib import Path
+import shutil
+import sys
 import time
+import typing as tp
 
 from .conf import SubmitRules, update_from_args
 from .main import DecoratedMain
@@ -18,6 +22,68 @@ from .log import simple_log
 from .utils import reliable_rmtree
 
 log = partial(simple_log, "Launch:")
+# Maximum delay in seconds before noticing a job is done with `--tail` or `--attach`.
+_FORCE_CHECK_EVERY = 15
+
+
+def _tail_offset(file: tp.BinaryIO, lines: int, block: int = 1 << 16) -> int:
+    """Return the offset at which the last `lines` lines of the file start."""
+    # A trailing new line does not start a new line.
+    pos = max(file.seek(0, os.SEEK_END) - 1, 0)
+    while pos > 0:
+        start = max(pos - block, 0)
+        file.seek(start)
+        chunk = file.read(pos - start)
+        index = len(chunk)
+        while True:
+            index = chunk.rfind(b"\n", 0, index)
+            if index == -1:
+                break
+            lines -= 1
+            if lines == 0:
+                return start + index + 1
+        pos = start
+    return 0
+
+
+class _LogTail:
+    """Follow a log file like `tail -n 200 -f`, but from within the process.
+    Call `update()` to print anything that was written since the last call.
+    """
+    def __init__(self, path: Path, lines: int = 200):
+        self._file = open(path, "rb")
+        self._file.seek(_tail_offset(self._file, lines))
+        self._sendfile = hasattr(os, "sendfile")
+
+    def update(self):
+        sys.stdout.flush()
+        if self._sendfile:
+            try:
+                self._send()
+                return
+            except OSError:
+                # stdout might not support it, e.g. a tty on old kernels, or no fd at all.
+                self._sendfile = False
+        shutil.copyfileobj(self._file, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+
+    def _send(self):
+        # Let the kernel copy from the log to stdout, without going through Python.
+        in_fd = self._file.fileno()
+        out_fd = sys.stdout.fileno()
+        offset = self._file.tell()
+        end = os.fstat(in_fd).st_size
+        try:
+            while offset < end:
+                sent = os.sendfile(out_fd, in_fd, offset, end - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        finally:
+            self._file.seek(offset)
+
+    def close(self):
+        self._file.close()
 
 
 def launch_action(args, main: DecoratedMain):
@@ -54,26 +120,37 @@ def launch_action(args, main: DecoratedMain):
 
     if args.tail or args.attach:
         done = False
-        tail_process = None
+        tail: tp.Optional[_LogTail] = None
         wait = True
+        last_forced = time.time()
         try:
             while True:
-                if sheep.log.exists() and tail_process is None:
-                    tail_process = sp.Popen(["tail", "-n", "200", "-f", sheep.log])
-                if sheep.is_done("force"):
+                if tail is None and sheep.log.exists():
+                    tail = _LogTail(sheep.log)
+                if tail is not None:
+                    tail.update()
+                # Submitit's Slurm watcher backs off its calls to Slurm up to every
+                # 10 minutes for old jobs, so we regularly force a check to notice
+                # the end of the job early enough.
+                mode = "standard"
+                if time.time() - last_forced >= _FORCE_CHECK_EVERY:
+                    mode = "force"
+                    last_forced = time.time()
+                if sheep.is_done(mode):
                     log("Remote process finished with state", sheep.state())
                     done = True
                     break
-                time.sleep(30)
+                time.sleep(1)
         except KeyboardInterrupt:
             wait = False
             log("KeyboardInterrupt received...")
         finally:
-            if tail_process:
+            if tail is not None:
                 if wait:
-                    # Give some time to tail to do its job.
+                    # Give some time for the last lines to make it to the log.
                     time.sleep(2)
-                tail_process.kill()
+                    tail.update()
+                tail.close()
             if args.attach and not done:
                 if sheep.job is not None:
                     log(f"attach is set, killing remote job {sheep.job.job_id}")
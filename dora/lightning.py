@@ -9,6 +9,7 @@ Support for PyTorch lightning. You should just replace the call
 to `Trainer(...)` with `get_trainer(...)`.
 For using `dora.log.LogProgress` as a progress bar with PL, see `PLLogProgress`.
 """
+from argparse import ArgumentParser
 import functools
 import inspect
 import os
@@ -20,9 +21,9 @@ try:
     from pytorch_lightning.callbacks.progress import ProgressBarBase
 except ImportError:
     raise ImportError("Only pytorch_lightning <= 1.8 is supported.")
+from pytorch_lightning.plugins import CheckpointIO, TorchCheckpointIO
 from pytorch_lightning.plugins.environments import ClusterEnvironment
 from pytorch_lightning.trainer import Trainer
-from pytorch_lightning.utilities.argparse import from_argparse_args
 import torch
 
 from . import distrib
@@ -38,6 +39,9 @@ def _filter_metrics(metrics: tp.Dict[str, tp.Any], epoch: bool = True):
         epoch: if True, keep only epoch level metrics, otherwise, keep only step level metrics.
     """
     out = {}
+    # Scalar tensors grouped by device and dtype, so that each group is moved
+    # to the CPU at once, rather than paying for one sync per `.item()`.
+    groups: tp.Dict[tp.Any, tp.List[tp.Tuple[str, torch.Tensor]]] = {}
     for key, value in metrics.items():
         if epoch and key.endswith('_step'):
             continue
@@ -46,8 +50,14 @@ def _filter_metrics(metrics: tp.Dict[str, tp.Any], epoch: bool = True):
         if key.endswith('_step') or key.endswith('_epoch'):
             key = key.rsplit('_', 1)[0]
         if isinstance(value, torch.Tensor) and value.numel() == 1:
-            value = value.item()
+            groups.setdefault((value.device, value.dtype), []).append((key, value))
         out[key] = value
+    for items in groups.values():
+        values = torch.stack([value.detach().reshape(()) for _, value in items]).tolist()
+        for (key, tensor), value in zip(items, values):
+            # A later value for the same key takes precedence, as before batching.
+            if out[key] is tensor:
+                out[key] = value
     return out
 
 
@@ -56,6 +66,11 @@ class DoraEnvironment(ClusterEnvironment):
         super().__init__()
         self.spec = distrib.get_distrib_spec()
         distrib.set_distrib_env()
+        # PL queries those a lot, so we store them as plain attributes.
+        self._world_size = self.spec.world_size
+        self._global_rank = self.spec.rank
+        self._local_rank = self.spec.local_rank
+        self._node_rank = self.spec.node_rank
 
     def creates_children(self) -> bool:
         return True
@@ -65,22 +80,22 @@ class DoraEnvironment(ClusterEnvironment):
         return True
 
     def world_size(self) -> int:
-        return self.spec.world_size
+        return self._world_size
 
     def set_world_size(self, size: int) -> None:
         pass
 
     def global_rank(self) -> int:
-        return self.spec.rank
+        return self._global_rank
 
     def set_global_rank(self, rank: int) -> None:
         pass
 
     def local_rank(self) -> int:
-        return self.spec.local_rank
+        return self._local_rank
 
     def node_rank(self) -> int:
-        return self.spec.node_rank
+        return self._node_rank
 
     @staticmethod
     def detect() -> bool:
@@ -112,6 +127,18 @@ class DoraCheckpointSync(Callback):
         return checkpoint
 
 
+class _AtomicCheckpointIO(TorchCheckpointIO):
+    # Write checkpoints to a temporary file that is then renamed, so that a job
+    # killed in the middle of a save cannot leave a truncated `last.ckpt` behind.
+    def save_checkpoint(self, checkpoint, path, storage_options=None):
+        if '://' in str(path):
+            # Remote filesystem, no atomic rename available.
+            return super().save_checkpoint(checkpoint, path, storage_options)
+        tmp = f"{path}.tmp"
+        super().save_checkpoint(checkpoint, tmp, storage_options)
+        os.replace(tmp, path)
+
+
 class DoraHistoryLogger(Callback):
     """Save metrics to Dora using the XP link.
     """
@@ -141,14 +168,33 @@ class _DummySLURMConnector:
         pass
 
 
+# Stateless, so a single instance can be shared by all trainers.
+_DUMMY_SLURM_CONNECTOR = _DummySLURMConnector()
+
+
+@functools.lru_cache(None)
+def _trainer_signature() -> inspect.Signature:
+    # Signature of the undecorated `Trainer.__init__`, computed once.
+    init = Trainer.__init__
+    while hasattr(init, '__wrapped__'):
+        init = init.__wrapped__
+    return inspect.signature(init)
+
+
 def get_trainer(*args, auto_resume=True, add_dora_logger=True, no_unfinished_epochs=True,
-                **kwargs):
+                atomic_checkpoint=False, **kwargs):
     """Return a PL trainer, adding the necessary glue code to make everything works.
     The arguments are exactly the same as for `pytorch_lightning.trainer.Trainer`,
     with a few extras documented after.
 
     ..note:: You should not pass `gpus=` or `num_nodes=` arguments as those will be filled by Dora.
 
+    ..note:: When running distributed, Dora uses the default DDP settings. You can tune them
+        by passing your own `strategy=`, e.g. `DDPStrategy(gradient_as_bucket_view=True,
+        bucket_cap_mb=...)`, in which case Dora will only provide the cluster environment.
+        This is also how to register a communication hook, e.g. BF16 gradient compression
+        with `DDPStrategy(ddp_comm_hook=default_hooks.bf16_compress_hook)`.
+
     Args:
         auto_resume (bool): if True, automatically resume previous checkpoints.
             You are still responsible for creating the `ModelCheckpoint` callback,
@@ -160,23 +206,36 @@ def get_trainer(*args, auto_resume=True, add_dora_logger=True, no_unfinished_epo
             by PL, which can result in half finished epoch with each interruption.
             It is recommended to instead dump a checkpoint every epoch and resume
             from that one so that training is reliable.
+        atomic_checkpoint (bool): if True, checkpoints are first written to a temporary
+            file and then renamed, so that an interrupted save cannot corrupt
+            the checkpoint used by `auto_resume`. Ignored if you provide
+            your own `CheckpointIO` plugin. If you pass your own `strategy=`,
+            leave this to False and set the strategy `checkpoint_io` instead,
+            as PL does not allow setting it both ways.
 
     """
     if not is_xp():
         raise RuntimeError("This can only be called from inside a Dora XP.")
 
-    # Convert all to kwargs, add [None] dummy for self which is missing.
-    init = Trainer.__init__
-    while hasattr(init, '__wrapped__'):
-        init = init.__wrapped__
-    kwargs = inspect.getcallargs(init, [None] + list(args), **kwargs)
+    # Convert all to kwargs, add None dummy for self which is missing.
+    bound = _trainer_signature().bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    kwargs = dict(bound.arguments)
     del kwargs['self']
 
     plugins = kwargs.pop("plugins") or []
-    env = DoraEnvironment()
-    gpus = min(torch.cuda.device_count(), env.world_size())
-    if env.world_size() > 1:
-        plugins += [env, 'ddp']
+    spec = distrib.get_distrib_spec()
+    gpus = min(torch.cuda.device_count(), spec.world_size)
+    # Exports MASTER_ADDR, RANK etc. when running distributed, or when forced
+    # with `DORA_FORCE_DISTRIB=1`, so that a custom strategy can rely on them.
+    distrib.set_distrib_env()
+    if spec.world_size > 1:
+        # Only needed for distributed training, single process runs skip the env setup.
+        plugins.append(DoraEnvironment())
+        if kwargs.get('strategy') is None:
+            plugins.append('ddp')
+    if atomic_checkpoint and not any(isinstance(p, CheckpointIO) for p in plugins):
+        plugins.append(_AtomicCheckpointIO())
     kwargs['plugins'] = plugins
 
     callbacks = kwargs.pop("callbacks", None) or []
@@ -189,7 +248,7 @@ def get_trainer(*args, auto_resume=True, add_dora_logger=True, no_unfinished_epo
         raise RuntimeError("You cannot specify the number of nodes, as this is provided by Dora.")
 
     kwargs['gpus'] = gpus
-    kwargs['num_nodes'] = env.spec.num_nodes
+    kwargs['num_nodes'] = spec.num_nodes
     kwargs['default_root_dir'] = get_xp().folder
 
     if add_dora_logger:
@@ -206,21 +265,22 @@ def get_trainer(*args, auto_resume=True, add_dora_logger=True, no_unfinished_epo
     trainer = Trainer(**kwargs)
 
     if no_unfinished_epochs:
-        trainer.slurm_connector = _DummySLURMConnector()
+        trainer.slurm_connector = _DUMMY_SLURM_CONNECTOR
 
     return trainer
 
 
-class _Intercept:
-    @functools.wraps(Trainer.__init__)
-    def __init__(self, *args, **kwargs):
-        self.args = args
-        self.kwargs = kwargs
-
-
 def trainer_from_argparse_args(args, **kwargs):
-    intercept = from_argparse_args(_Intercept, args, **kwargs)
-    return get_trainer(*intercept.args, **intercept.kwargs)
+    """Equivalent of `Trainer.from_argparse_args` but going through `get_trainer`.
+    Only the arguments known to the Trainer are used, `kwargs` take precedence.
+    """
+    if isinstance(args, ArgumentParser):
+        args = Trainer.parse_argparser(args)
+    params = vars(args)
+    valid = _trainer_signature().parameters
+    trainer_kwargs = {name: params[name] for name in valid if name != 'self' and name in params}
+    trainer_kwargs.update(kwargs)
+    return get_trainer(**trainer_kwargs)
 
 
 class PLLogProgress(ProgressBarBase):
@@ -297,10 +357,13 @@ class PLLogProgress(ProgressBarBase):
         return super().on_validation_epoch_start(trainer, pl_module)
 
     def _on_batch_end(self, stage):
-        metrics = self.get_metrics(self.trainer, self.pl_module)
-        metrics = _filter_metrics(metrics, epoch=False)
-        formatted = self._format_metrics(metrics, stage, epoch=False)
-        self.logprog.update(**formatted)
+        # Metrics are only displayed on the few batches where `logprog` logs,
+        # so we skip fetching and formatting them for all the others.
+        if self.logprog.update():
+            metrics = self.get_metrics(self.trainer, self.pl_module)
+            metrics = _filter_metrics(metrics, epoch=False)
+            formatted = self._format_metrics(metrics, stage, epoch=False)
+            self.logprog.update(**formatted)
         next(self.logprog)
 
     def on_train_batch_end(self, *args, **kwargs):
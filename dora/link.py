@@ -9,11 +9,21 @@ import logging
 from pathlib import Path
 import typing as tp
 
-from retrying import retry
 from . import utils
 
 logger = logging.getLogger(__name__)
 
+_SCALARS = (str, int, float, type(None))
+_LOAD_ATTEMPTS = 10
+
+
+def _jsonable_metrics(metrics: dict) -> dict:
+    # Fast path for the usual flat dict of scalars, which `utils.jsonable` would
+    # only copy after a recursive traversal.
+    if isinstance(metrics, dict) and all(isinstance(v, _SCALARS) for v in metrics.values()):
+        return dict(metrics)
+    return utils.jsonable(metrics)
+
 
 class Link:
     """
@@ -29,16 +39,26 @@ class Link:
         """
         self.history: tp.List[dict] = []
         self.history_file = history_file
+        # Content of the history file as last read or written, to skip no-op commits.
+        self._last_content: tp.Optional[bytes] = None
 
-    # Retry operation as history file might be stale for  update by running XP
-    @retry(stop_max_attempt_number=10)
     def load(self):
+        # Retry operation as history file might be stale for update by running XP
+        for attempt in range(_LOAD_ATTEMPTS):
+            try:
+                return self._load()
+            except (OSError, ValueError):
+                if attempt == _LOAD_ATTEMPTS - 1:
+                    raise
+
+    def _load(self):
         if self.history_file is None:
             return
         if self.history_file.exists():
-            history = utils.try_load(self.history_file, load=json.load, mode='r')
-            if history is not None:
-                self.history = history
+            content = utils.try_load(self.history_file, load=lambda f: f.read())
+            if content is not None:
+                self.history = json.loads(content)
+                self._last_content = content
 
     def _commit(self):
         if self.history_file is None:
@@ -47,17 +67,25 @@ class Link:
         from . import distrib
         if not distrib.is_master():
             return
-        with utils.write_and_rename(self.history_file, "w") as tmp:
-            json.dump(self.history, tmp, indent=2)
+        # Encode at once, `json.dump` would issue one `write()` per JSON token.
+        content = json.dumps(self.history, indent=2).encode('utf8')
+        if content == self._last_content:
+            return
+        with utils.write_and_rename(self.history_file) as tmp:
+            tmp.write(content)
+        self._last_content = content
 
     def update_history(self, history: tp.List[dict]):
-        history = utils.jsonable(history)
+        if isinstance(history, (list, tuple)):
+            history = [_jsonable_metrics(metrics) for metrics in history]
+        else:
+            history = utils.jsonable(history)
         if not isinstance(history, list):
             raise ValueError(f"history must be a list, but got {type(history)}")
         self.history[:] = history
         self._commit()
 
     def push_metrics(self, metrics: dict):
-        metrics = utils.jsonable(metrics)
+        metrics = _jsonable_metrics(metrics)
         self.history.append(metrics)
         self._commit()
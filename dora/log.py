@@ -59,7 +59,14 @@ class LogProgress:
         self._will_log = False
         self._index = -1
         self._infos = {}
-        self._begin = time.time()
+        self._begin = time.monotonic()
+        if self.updates > 0 and self.logger.isEnabledFor(self.level):
+            self._log_every = max(1, self.min_interval, self.total // self.updates)
+            # logging is delayed by 1 it, in order to have the metrics from update
+            self._next_log = self._log_every
+        else:
+            # Never log, which also tells `update()` callers to not bother with metrics.
+            self._next_log = -1
         return self
 
     def __next__(self):
@@ -72,15 +79,13 @@ class LogProgress:
             raise
         else:
             self._index += 1
-            if self.updates > 0:
-                log_every = max(self.min_interval, self.total // self.updates)
-                # logging is delayed by 1 it, in order to have the metrics from update
-                if self._index >= 1 and self._index % log_every == 0:
-                    self._will_log = True
+            if self._index == self._next_log:
+                self._will_log = True
+                self._next_log += self._log_every
             return value
 
     def _log(self):
-        self._speed = (1 + self._index) / (time.time() - self._begin)
+        self._speed = (1 + self._index) / (time.monotonic() - self._begin)
         infos = " | ".join(f"{k.capitalize()} {v}" for k, v in self._infos.items())
         if self._speed < 1e-4:
             speed = "oo sec/it"
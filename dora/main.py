@@ -13,18 +13,34 @@ This is also where the end user will specify how to launch job, default
 Slurm configuration, storage location, naming conventions etc.
 """
 
-import argparse
-from collections import OrderedDict
 import importlib
 import json
 from pathlib import Path
 import typing as tp
 import sys
+import uuid
 
 from .conf import DoraConfig, SlurmConfig
 from .names import NamesMixin
+from .utils import write_and_rename
 from .xp import XP, _context
 
+if tp.TYPE_CHECKING:
+    import argparse
+
+
+def _write_argv_cache(path: Path, content: bytes):
+    # `init_xp` runs in every process of a distributed job, so each writer
+    # needs its own temporary file, otherwise one rank could rename it
+    # away while another one is still writing to it.
+    try:
+        if path.read_bytes() == content:
+            return
+    except OSError:
+        pass
+    with write_and_rename(path, suffix=f".{uuid.uuid4().hex}.tmp") as f:
+        f.write(content)
+
 
 MainFun = tp.Callable
 
@@ -56,6 +72,8 @@ class DecoratedMain(NamesMixin):
         dora (DoraConfig): configuration for Dora.
     """
     _slow = False
+    # Shared xps folders already created in this process, shared by all XPs of a grid.
+    _shared_roots: tp.Set[Path] = set()
 
     def __init__(self, main: MainFun, dora: DoraConfig):
         self.main = main
@@ -67,14 +85,13 @@ class DecoratedMain(NamesMixin):
             self.package = 'unknown'
             self.main_module = 'train'
         else:
-            if '.' in module_name:
-                self.package, self.main_module = module_name.rsplit(".", 1)
-            else:
-                self.package = 'unknown'
-                self.main_module = module_name
+            package, dot, self.main_module = module_name.rpartition(".")
+            self.package = package if dot else 'unknown'
 
         self.name = self.package
         self._full_name = main.__module__ + "." + main.__name__
+        # Cache of `get_argv_from_sig`, as the argv of a sig is read many times by grids.
+        self._argv_by_sig: tp.Dict[str, tp.List[str]] = {}
 
     def __call__(self):
         argv = self._get_argv()
@@ -115,17 +132,29 @@ class DecoratedMain(NamesMixin):
         can be easily shared using its signature.
         """
         xp.folder.mkdir(exist_ok=True, parents=True)
-        json.dump(xp.argv, open(xp._argv_cache, 'w'))
+        # Encoded once for both the local and shared argv caches.
+        content = json.dumps(xp.argv).encode('utf8')
+        _write_argv_cache(xp._argv_cache, content)
+        self._argv_by_sig[xp.sig] = list(xp.argv)
         if xp._shared_argv_cache is not None:
-            # Create xps and XP folders with 0777 mode.
-            xp._shared_argv_cache.parent.parent.mkdir(exist_ok=True, parents=True, mode=0o777)
-            xp._shared_argv_cache.parent.mkdir(exist_ok=True, parents=True, mode=0o777)
-            try:
-                xp._shared_argv_cache.parent.parent.chmod(0o777)
-                xp._shared_argv_cache.parent.chmod(0o777)
-            except PermissionError:
-                pass
-            json.dump(xp.argv, open(xp._shared_argv_cache, 'w'))
+            folder = xp._shared_argv_cache.parent
+            if not folder.exists():
+                # Create xps and XP folders with 0777 mode. An existing folder
+                # was already set up by whoever created it.
+                root = folder.parent
+                if root not in DecoratedMain._shared_roots:
+                    root.mkdir(exist_ok=True, parents=True, mode=0o777)
+                    try:
+                        root.chmod(0o777)
+                    except PermissionError:
+                        pass
+                    DecoratedMain._shared_roots.add(root)
+                folder.mkdir(exist_ok=True, parents=True, mode=0o777)
+                try:
+                    folder.chmod(0o777)
+                except PermissionError:
+                    pass
+            _write_argv_cache(xp._shared_argv_cache, content)
             try:
                 xp._shared_argv_cache.chmod(0o777)
             except PermissionError:
@@ -136,13 +165,18 @@ class DecoratedMain(NamesMixin):
         """Returns the argv used to obtain a given signature.
         This can only work if an XP was previously ran with this signature.
         """
-        xp = XP(sig=sig, dora=self.dora, cfg=None, argv=[])
-        if xp._argv_cache.exists():
-            return json.load(open(xp._argv_cache))
-        elif xp._shared_argv_cache is not None and xp._shared_argv_cache.exists():
-            return json.load(open(xp._shared_argv_cache))
-        else:
-            raise RuntimeError(f"Could not find experiment with signature {sig}")
+        argv = self._argv_by_sig.get(sig)
+        if argv is None:
+            xp = XP(sig=sig, dora=self.dora, cfg=None, argv=[])
+            if xp._argv_cache.exists():
+                path = xp._argv_cache
+            elif xp._shared_argv_cache is not None and xp._shared_argv_cache.exists():
+                path = xp._shared_argv_cache
+            else:
+                raise RuntimeError(f"Could not find experiment with signature {sig}")
+            argv = json.loads(path.read_bytes())
+            self._argv_by_sig[sig] = argv
+        return list(argv)
 
     def get_xp_from_sig(self, sig: str) -> XP:
         """Returns the XP from the signature. Can only work if such an XP
@@ -189,7 +223,7 @@ class ArgparseMain(DecoratedMain):
             will translate to the command-line `--batch-size=32`,
             otherwise, it will stay as `--batch_size=32`.
     """
-    def __init__(self, main: MainFun, dora: DoraConfig, parser: argparse.ArgumentParser,
+    def __init__(self, main: MainFun, dora: DoraConfig, parser: 'argparse.ArgumentParser',
                  slurm: tp.Optional[SlurmConfig] = None, use_underscore: bool = True):
         super().__init__(main, dora)
         self.parser = parser
@@ -199,34 +233,45 @@ class ArgparseMain(DecoratedMain):
     def get_xp(self, argv: tp.Sequence[str]) -> XP:
         argv = list(argv)
         args = self.parser.parse_args(argv)
-        delta = []
-        for key, value in args.__dict__.items():
-            if self.parser.get_default(key) != value:
-                delta.append((key, value))
+        defaults = self._get_defaults()
+        delta = [(key, value) for key, value in args.__dict__.items()
+                 if defaults.get(key) != value]
         xp = XP(dora=self.dora, cfg=args, argv=argv, delta=delta)
         return xp
 
+    def _get_defaults(self) -> tp.Dict[str, tp.Any]:
+        # Same as `parser.get_default` for all keys at once, rather than scanning
+        # all the actions for each key.
+        defaults = dict(self.parser._defaults)
+        for action in reversed(self.parser._actions):
+            if action.default is not None:
+                defaults[action.dest] = action.default
+        return defaults
+
     def value_to_argv(self, arg: tp.Any) -> tp.List[str]:
-        argv = []
-        if isinstance(arg, str):
-            argv.append(arg)
-        elif isinstance(arg, dict):
-            for key, value in arg.items():
-                if not self.use_underscore:
-                    key = key.replace("_", "-")
-                if value is True:
-                    argv.append(f"--{key}")
-                else:
-                    argv.append(f"--{key}={value}")
-        elif isinstance(arg, (list, tuple)):
-            for part in arg:
-                argv += self.value_to_argv(part)
-        else:
-            raise ValueError(f"Can only process dict, tuple, lists and str, but got {arg}")
+        argv: tp.List[str] = []
+        # Nested lists are processed with a stack rather than recursively.
+        stack = [arg]
+        while stack:
+            arg = stack.pop()
+            if isinstance(arg, str):
+                argv.append(arg)
+            elif isinstance(arg, dict):
+                for key, value in arg.items():
+                    if not self.use_underscore:
+                        key = key.replace("_", "-")
+                    if value is True:
+                        argv.append(f"--{key}")
+                    else:
+                        argv.append(f"--{key}={value}")
+            elif isinstance(arg, (list, tuple)):
+                stack.extend(reversed(arg))
+            else:
+                raise ValueError(f"Can only process dict, tuple, lists and str, but got {arg}")
         return argv
 
-    def get_name_parts(self, xp: XP) -> OrderedDict:
-        parts = OrderedDict()
+    def get_name_parts(self, xp: XP) -> tp.Dict[str, tp.Any]:
+        parts = {}
         assert xp.delta is not None
         for name, value in xp.delta:
             parts[name] = value
@@ -240,7 +285,7 @@ class ArgparseMain(DecoratedMain):
         return super().get_slurm_config()
 
 
-def argparse_main(parser: argparse.ArgumentParser, *,
+def argparse_main(parser: 'argparse.ArgumentParser', *,
                   dir: tp.Union[str, Path] = "./outputs",
                   exclude: tp.Sequence[str] = [],
                   slurm: tp.Optional[SlurmConfig] = None,
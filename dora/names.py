@@ -4,13 +4,24 @@
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
 
-from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 import typing as tp
 
 from .xp import XP
 
 
+@lru_cache(maxsize=1024)
+def _shorten_key(key: str) -> str:
+    # The same keys come back for every XP of a grid, so this is cached.
+    key_parts = key.split(".")
+    short_key_parts = []
+    for part in key_parts[:-1]:
+        short_key_parts.append(part[:3])
+    short_key_parts.append(key_parts[-1])
+    return ".".join(short_key_parts)
+
+
 class NamesMixin:
     """Mixin that handles everything related to the naming of experiments.
     """
@@ -18,21 +29,15 @@ class NamesMixin:
     def short_name_part(self, key: str, value: tp.Any) -> str:
         """Shorten the name of an XP.
         """
-        key_parts = key.split(".")
-        short_key_parts = []
-        for part in key_parts[:-1]:
-            short_key_parts.append(part[:3])
-        short_key_parts.append(key_parts[-1])
-        key = ".".join(short_key_parts)
-
+        key = _shorten_key(key)
         if isinstance(value, Path):
             value = value.name
         if value is True:
             return key
         return f"{key}={value}"
 
-    def get_name_parts(self, xp: XP) -> OrderedDict:
-        """Returns name parts, i.e. an OrderedDict from param name -> param value.
+    def get_name_parts(self, xp: XP) -> tp.Dict[str, tp.Any]:
+        """Returns name parts, i.e. an ordered dict from param name -> param value.
         Name parts that don't impact the signature should be ignored.
         """
         raise NotImplementedError()
@@ -40,9 +45,10 @@ class NamesMixin:
     def get_name(self, xp: XP) -> str:
         """Returns the XP name.
         """
-        return self.get_names([xp])[-1]
+        # Same as `self.get_names([xp])[-1]`, with a single XP nothing is factored out.
+        return self._get_short_name(self.get_name_parts(xp))
 
-    def _get_short_name(self, parts: OrderedDict, reference: dict = {}):
+    def _get_short_name(self, parts: dict, reference: dict = {}):
         out_parts = []
         for key, value in parts.items():
             if key not in reference:
@@ -55,19 +61,13 @@ class NamesMixin:
         The common part in all XPs are factored into the base name
         """
         assert len(xps) > 0
-        reference = self.get_name_parts(xps[0])
-        all_xp_parts = []
-        for xp in xps:
-            parts = self.get_name_parts(xp)
-            for key, val in parts.items():
-                if key in reference and reference[key] != val:
+        all_xp_parts = [self.get_name_parts(xp) for xp in xps]
+        reference = all_xp_parts[0].copy()
+        for parts in all_xp_parts[1:]:
+            for key in list(reference):
+                if key not in parts or reference[key] != parts[key]:
                     reference.pop(key)
 
-            missing = set(reference.keys()) - set(parts.keys())
-            for key in missing:
-                reference.pop(key)
-            all_xp_parts.append(parts)
-
         names = []
         for parts in all_xp_parts:
             names.append(self._get_short_name(parts, reference))
@@ -24,7 +24,8 @@ log = partial(simple_log, "Export:")
 
 
 def dump(value):
-    bits = zlib.compress(json.dumps(value).encode())
+    # Compact and strongly compressed, as this is meant to be copy pasted.
+    bits = zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 9)
     b64 = base64.b64encode(bits)
     return textwrap.fill(b64.decode())
 
@@ -16,16 +16,14 @@ import subprocess as sp
 import sys
 import typing as tp
 
-
-from submitit import SlurmJob
-import submitit
-
 from . import git_save
 from .conf import SlurmConfig, SubmitRules
 from .main import DecoratedMain
-from .utils import try_load
+from .utils import try_load, write_and_rename
 from .xp import XP, _get_sig, get_xp
 
+if tp.TYPE_CHECKING:
+    import submitit
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +60,7 @@ class _SubmitItTarget:
             xp = get_xp()
             if xp.rendezvous_file.exists():
                 xp.rendezvous_file.unlink()
+        import submitit
         return submitit.helpers.DelayedSubmission(self, *args, **kwargs)
 
 
@@ -72,10 +71,10 @@ class Sheep:
     """
     def __init__(self, xp: XP):
         self.xp = xp
-        self.job: tp.Optional[submitit.SlurmJob] = None
+        self.job: tp.Optional['submitit.SlurmJob'] = None
         # Other jobs contain the list of other jobs in the array
-        self._other_jobs: tp.List[submitit.SlurmJob] = []
-        self._dependent_jobs: tp.List[submitit.SlurmJob] = []
+        self._other_jobs: tp.List['submitit.SlurmJob'] = []
+        self._dependent_jobs: tp.List['submitit.SlurmJob'] = []
         if self._job_file.exists():
             content = try_load(self._job_file)
             if isinstance(content, tuple):
@@ -139,7 +138,8 @@ class Sheep:
             chain = [self.job] + self._dependent_jobs
             for job in chain:
                 state = Sheep._get_state(job, [], mode)
-                if state == 'COMPLETED' or not Sheep._is_done(job, mode):
+                # The watcher was just updated if needed, no need to query it again.
+                if state == 'COMPLETED' or not Sheep._is_done(job, "cache"):
                     return state
             return state
         else:
@@ -207,7 +207,7 @@ class Shepherd:
 
         self._in_job_array: bool = False
         self._existing_git_clone: tp.Optional[Path] = None
-        self._to_cancel: tp.List[submitit.SlurmJob] = []
+        self._to_cancel: tp.List['submitit.SlurmJob'] = []
         self._to_submit: tp.List[_JobArray] = []
 
         self._check_orphans()
@@ -246,6 +246,7 @@ class Shepherd:
         """
         Force an update of all job states with submitit.
         """
+        from submitit import SlurmJob
         SlurmJob.watcher.update()
 
     @contextmanager
@@ -288,8 +289,8 @@ class Shepherd:
             assert slurm_config == self._to_submit[-1].slurm_config
             self._to_submit[-1].sheeps.append(sheep)
 
-    def cancel_lazy(self, job: tp.Optional[submitit.SlurmJob] = None,
-                    dependent_jobs: tp.Sequence[submitit.SlurmJob] = [],
+    def cancel_lazy(self, job: tp.Optional['submitit.SlurmJob'] = None,
+                    dependent_jobs: tp.Sequence['submitit.SlurmJob'] = [],
                     sheep: tp.Optional[Sheep] = None):
         """
         Cancel a job. The job is actually cancelled only when `commit()` is called.
@@ -330,13 +331,14 @@ class Shepherd:
     def _arrays(self) -> Path:
         return self.main.dora.dir / self.main.dora.shep.arrays
 
-    def _cancel(self, jobs: tp.List[SlurmJob]):
+    def _cancel(self, jobs: tp.List['submitit.SlurmJob']):
         cancel_cmd = ["scancel"] + [job.job_id for job in jobs]
         logger.debug("Running %s", " ".join(cancel_cmd))
         sp.run(cancel_cmd, check=True)
 
     def _get_submitit_executor(self, name: str, folder: Path,
-                               slurm_config: SlurmConfig) -> submitit.SlurmExecutor:
+                               slurm_config: SlurmConfig) -> 'submitit.SlurmExecutor':
+        import submitit
         os.environ['SLURM_KILL_BAD_EXIT'] = '1'  # Kill the job if any of the task fails
         kwargs = dict(slurm_config.__dict__)
         executor = submitit.SlurmExecutor(
@@ -378,16 +380,21 @@ class Shepherd:
 
     def _check_orphans(self):
         """Check for orphaned jobs."""
-        for dirty in self._orphans.iterdir():
-            name = dirty.name
-            logger.warning(f"Found dirty tag {name}, meaning a job might have been scheduled "
+        dirties = list(self._orphans.iterdir())
+        if not dirties:
+            return
+        for dirty in dirties:
+            logger.warning(f"Found dirty tag {dirty.name}, meaning a job might have been scheduled "
                            "but Dora or Slurm crashed before the job id was saved.")
-            proc = sp.run(["squeue", "-u", os.getlogin(), "-n", name, "-o", "%i", "-h"],
-                          capture_output=True, check=True)
-            ids = [line.split('_')[0] for line in proc.stdout.decode().strip().split("\n") if line]
-            if ids:
-                logger.warning(f"Found orphan job ids {ids}, will cancel")
-                sp.run(["scancel"] + ids, check=True)
+        # A single squeue call for all the names, rather than one per orphan.
+        names = ",".join(dirty.name for dirty in dirties)
+        proc = sp.run(["squeue", "-u", os.getlogin(), "-n", names, "-o", "%i", "-h"],
+                      capture_output=True, check=True)
+        ids = [line.split('_')[0] for line in proc.stdout.decode().strip().split("\n") if line]
+        if ids:
+            logger.warning(f"Found orphan job ids {ids}, will cancel")
+            sp.run(["scancel"] + ids, check=True)
+        for dirty in dirties:
             dirty.unlink()
 
     @contextmanager
@@ -408,11 +415,17 @@ class Shepherd:
 
         is_array = len(sheeps) > 1
         first = sheeps[0]
-        self.main.init_xp(first.xp)
         use_git_save = first.xp.dora.git_save
         assert all(other.xp.dora.git_save == use_git_save for other in sheeps), \
             "All jobs inside an array must have the same value for git_save."""
 
+        # Must happen first, as the XP folder is needed for the submitit folder below.
+        for sheep in sheeps:
+            xp = sheep.xp
+            self.main.init_xp(xp)
+            if xp.rendezvous_file.exists():
+                xp.rendezvous_file.unlink()
+
         requeue = True
         if slurm_config.dependents:
             assert not is_array, "Cannot use dependent jobs and job arrays"
@@ -432,14 +445,8 @@ class Shepherd:
             submitit_folder = first.xp._xp_submitit
         submitit_folder.mkdir(exist_ok=True)
 
-        for sheep in sheeps:
-            xp = sheep.xp
-            self.main.init_xp(xp)
-            if xp.rendezvous_file.exists():
-                xp.rendezvous_file.unlink()
-
         executor = self._get_submitit_executor(name, submitit_folder, slurm_config)
-        jobs: tp.List[submitit.Job] = []
+        jobs: tp.List['submitit.Job'] = []
         if use_git_save and self._existing_git_clone is None:
             self._existing_git_clone = git_save.get_new_clone(self.main)
         with self._enter_orphan(name):
@@ -469,28 +476,32 @@ class Shepherd:
                 dependent_jobs = jobs[1:]
                 jobs = jobs[:1]
 
+            if is_array:
+                submitit_folder_resolved = submitit_folder.resolve()
             # Now we can access jobs
             for sheep, job in zip(sheeps, jobs):
                 # See commment in `Sheep.state` function above for storing all jobs in the array.
-                pickle.dump((job, jobs, dependent_jobs), open(sheep._job_file, "wb"))
+                with write_and_rename(sheep._job_file) as f:
+                    pickle.dump((job, jobs, dependent_jobs), f)
                 logger.debug("Created job with id %s", job.job_id)
                 sheep.job = job  # type: ignore
                 sheep._other_jobs = jobs  # type: ignore
                 sheep._dependent_jobs = dependent_jobs  # type: ignore
                 link = self._by_id / job.job_id
-                link = link
                 link.symlink_to(sheep.xp.folder.resolve())
                 if is_array:
                     # We link the array submitit folder to be sure
                     # we keep an history of all arrays the XP was in.
                     submitit_link = (sheep.xp.folder / submitit_folder.name)
                     if submitit_link.exists():
-                        assert submitit_link.resolve() == submitit_folder.resolve()
+                        assert submitit_link.resolve() == submitit_folder_resolved
                     else:
                         submitit_link.symlink_to(submitit_folder)
                 latest = sheep.xp._latest_submitit
-                if latest.exists():
+                try:
                     latest.unlink()
+                except FileNotFoundError:
+                    pass
                 latest.symlink_to(submitit_folder)
 
                 name = self.main.get_name(sheep.xp)
@@ -9,7 +9,7 @@ import sys
 
 import pytest
 
-from ..hydra import hydra_main
+from ..hydra import hydra_main, _hydra_value_as_override
 from ..git_save import assign_clone, get_new_clone, enter_clone, to_absolute_path
 from ..xp import get_xp, XP
 
@@ -135,3 +135,13 @@ def test_complex_types(tmpdir):
     argv = main.value_to_argv({"complex.b": {"a": 21, "b": 52}})
     xp = call(main, argv)
     assert xp.cfg.complex.b == {"a": 21, "b": 52}
+
+
+def test_value_as_override_cache():
+    # The cache should not mix up values that are equal but formatted differently.
+    assert _hydra_value_as_override(1) == "1"
+    assert _hydra_value_as_override(True) == "true"
+    assert _hydra_value_as_override(1.0) == "1.0"
+    assert _hydra_value_as_override([1]) == "[1]"
+    assert _hydra_value_as_override([True]) == "[true]"
+    assert _hydra_value_as_override({"a": [1, None]}) == "{a: [1, null]}"
@@ -0,0 +1,54 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the license found in the
+# LICENSE file in the root directory of this source tree.
+
+from pathlib import Path
+
+from ..launch import _LogTail, _tail_offset
+
+
+def test_tail_offset(tmpdir):
+    path = Path(str(tmpdir)) / 'log.out'
+    lines = [f"line {idx}\n".encode() for idx in range(1000)]
+    path.write_bytes(b"".join(lines))
+    with open(path, "rb") as f:
+        for count in [1, 2, 200, 999]:
+            f.seek(_tail_offset(f, count, block=64))
+            assert f.read() == b"".join(lines[-count:])
+        assert _tail_offset(f, 1000, block=64) == 0
+        assert _tail_offset(f, 2000) == 0
+
+    path.write_bytes(b"no new line\nat the end")
+    with open(path, "rb") as f:
+        f.seek(_tail_offset(f, 1))
+        assert f.read() == b"at the end"
+
+    path.write_bytes(b"")
+    with open(path, "rb") as f:
+        assert _tail_offset(f, 200) == 0
+
+
+def _check_log_tail(tmpdir, capture):
+    path = Path(str(tmpdir)) / 'log.out'
+    path.write_bytes(b"".join(f"line {idx}\n".encode() for idx in range(10)))
+    tail = _LogTail(path, lines=2)
+    tail.update()
+    assert capture.readouterr().out == "line 8\nline 9\n"
+    with open(path, "ab") as f:
+        f.write(b"line 10\n")
+    tail.update()
+    tail.update()
+    assert capture.readouterr().out == "line 10\n"
+    tail.close()
+
+
+def test_log_tail_fd(tmpdir, capfd):
+    # Real file descriptor, goes through `os.sendfile` when available.
+    _check_log_tail(tmpdir, capfd)
+
+
+def test_log_tail_no_fd(tmpdir, capsys):
+    # No file descriptor for stdout, falls back to copying in Python.
+    _check_log_tail(tmpdir, capsys)
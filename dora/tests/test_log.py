@@ -0,0 +1,26 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the license found in the
+# LICENSE file in the root directory of this source tree.
+
+import logging
+
+from ..log import LogProgress
+
+
+def _logged_indexes(total, level=logging.INFO, **kwargs):
+    logger = logging.Logger("test_log", level)
+    records = []
+    logger.log = lambda level, msg: records.append(msg.split(" | ")[1])  # type: ignore
+    for _ in LogProgress(logger, range(total), **kwargs):
+        pass
+    return records
+
+
+def test_log_progress():
+    assert _logged_indexes(100) == ['20/100', '40/100', '60/100', '80/100']
+    assert _logged_indexes(3) == ['1/3', '2/3']
+    assert _logged_indexes(100, min_interval=30) == ['30/100', '60/100', '90/100']
+    assert _logged_indexes(100, updates=0) == []
+    assert _logged_indexes(100, level=logging.WARNING) == []
@@ -5,7 +5,9 @@
 # LICENSE file in the root directory of this source tree.
 
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import json
 import os
 import sys
 
@@ -73,6 +75,18 @@ def test_shared(tmpdir):
     assert xp2.argv == xp.argv
 
 
+def test_concurrent_init(tmpdir):
+    main = get_main(tmpdir / 'a', tmpdir / 'shared')
+    xp = main.get_xp(['--a=5'])
+    with ThreadPoolExecutor(16) as pool:
+        for _ in pool.map(lambda _: main.init_xp(xp), range(64)):
+            pass
+    assert json.loads(xp._argv_cache.read_text()) == xp.argv
+    assert json.loads(xp._shared_argv_cache.read_text()) == xp.argv
+    assert list(Path(xp.folder).glob('*.tmp')) == []
+    assert list(xp._shared_argv_cache.parent.glob('*.tmp')) == []
+
+
 def test_main(tmpdir):
     main = get_main(tmpdir)
     xp = call(main, [])
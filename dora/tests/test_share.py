@@ -4,9 +4,20 @@
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
 
+import base64
+import json
+import zlib
+
 from dora.share import dump, load
 
 
 def test_dump_load():
     x = [1, 2, 4, {'youpi': 'test', 'b': 56.3}]
     assert load(dump(x)) == x
+
+
+def test_load_legacy():
+    # Strings exported by older versions must still be importable.
+    x = [['--a=1', '--b'], ['--a=2']]
+    legacy = base64.b64encode(zlib.compress(json.dumps(x).encode())).decode()
+    assert load(legacy) == x
@@ -40,6 +40,9 @@ def test_sig(tmpdir):
     xp3 = XP(dora=dora, cfg=_Cfg(), argv=[], delta=[("a", 12), ("b", 24)])
     assert xp.sig != xp3.sig
 
+    # Signatures must remain stable across versions of Dora.
+    assert xp.sig == "898ffd44"
+
 
 def test_properties(tmpdir):
     tmpdir = Path(str(tmpdir))
@@ -69,6 +72,13 @@ def test_link(tmpdir):
     val = [{"plok": 43, "out": Path("plop"), "mat": torch.zeros(5)}]
     xp.link.update_history(val)
     assert xp.link.history == [{"plok": 43, "out": "plop", "mat": [0.] * 5}]
+
+    # Committing the same history again is a no-op, the file is not replaced.
+    inode = xp.history.stat().st_ino
+    xp.link.update_history(list(xp.link.history))
+    assert xp.history.stat().st_ino == inode
+    xp.link.update_history(val + [{"plop": 42}])
+    assert xp.history.stat().st_ino != inode
     with pytest.raises(ValueError):
         xp.link.update_history({"plop": 42})
 
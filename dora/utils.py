@@ -54,7 +54,7 @@ def write_and_rename(path: Path, mode: str = "wb", suffix: str = ".tmp"):
     tmp_path = str(path) + suffix
     with open(tmp_path, mode) as f:
         yield f
-    os.rename(tmp_path, path)
+    os.replace(tmp_path, path)
 
 
 def try_load(path: Path, load=pickle.load, mode: str = "rb"):
@@ -63,7 +63,8 @@ def try_load(path: Path, load=pickle.load, mode: str = "rb"):
     Return None upon failure.
     """
     try:
-        return load(open(path, mode))
+        with open(path, mode) as f:
+            return load(f)
     except (OSError, pickle.UnpicklingError, RuntimeError, EOFError) as exc:
         # Trying to list everything that can go wrong.
         logger.warning(
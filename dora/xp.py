@@ -18,6 +18,9 @@ from .utils import jsonable
 
 def _get_sig(delta: tp.List[tp.Any]) -> str:
     # Return signature from a jsonable content.
+    # Signatures name the XP folders and are used to share XPs, so neither the hash
+    # function nor the exact JSON serialization (separators, float formatting etc.)
+    # can ever change, or all existing XPs would be lost.
     sorted_delta = sorted(delta)
     return sha1(json.dumps(sorted_delta).encode('utf8')).hexdigest()[:8]
 
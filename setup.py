@@ -45,7 +45,7 @@ setup(
     url=URL,
     packages=find_packages(),
     package_data={"dora": ["py.typed"]},
-    install_requires=['omegaconf', 'retrying', 'submitit', 'treetable', 'torch'],
+    install_requires=['omegaconf', 'submitit', 'treetable', 'torch'],
     include_package_data=True,
     entry_points={
         'console_scripts': ['dora=dora.__main__:main'],